@@ -0,0 +1,332 @@
+"""Бенчмарки конвейеров телематики (lab5) и результатов олимпиады (lab1_3).
+
+Данные генерируются синтетически в схеме выгрузок lab5 и ejudge. Для каждого
+размера замеряются время, пропускная способность и память каждого этапа,
+результаты сохраняются в benchmarks/results/<время>-<коммит>.json и
+сравниваются с предыдущим запуском.
+
+Пример запуска:
+    python benchmarks/bench.py --sizes 10000 100000 1000000
+
+Бенчмарк ConnectDB.insert выполняется, только если задана переменная
+окружения BENCH_PG_DBNAME (а также при необходимости BENCH_PG_USER,
+BENCH_PG_PASSWORD, BENCH_PG_HOST, BENCH_PG_PORT) — например, для локального
+PostgreSQL в Docker.
+"""
+import argparse
+import ast
+import contextlib
+import functools
+import glob
+import http.server
+import importlib.util
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def import_lab(relpath):
+    """Импортирует модуль лабораторной работы по пути относительно корня репозитория."""
+    path = os.path.join(ROOT, relpath)
+    # Модули лабораторных импортируют соседние файлы как модули верхнего уровня
+    sys.path.insert(0, os.path.dirname(path))
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ========================== Генераторы данных ==========================
+
+def generate_telematics(n, path, terminals=5, seed=0):
+    """Генерирует CSV файл в схеме выгрузок lab4/lab5.
+
+    Уровень топлива — случайное блуждание с редкими заправками и сливами,
+    скорость — случайная величина с эпизодами превышения.
+
+    Args:
+        n (int): Количество строк.
+        path (str): Путь к создаваемому файлу.
+        terminals (int): Количество терминалов.
+        seed (int): Начальное значение генератора случайных чисел.
+    """
+    rng = np.random.default_rng(seed)
+    terminal_ids = 433100526900000 + rng.integers(0, 100000, size=terminals)
+    terminal = terminal_ids[rng.integers(0, terminals, size=n)]
+    timestamp = 1691250000 + np.sort(rng.integers(0, 86400, size=n))
+
+    steps = rng.normal(0, 5, size=n).round()
+    events = rng.random(n)
+    steps[events < 0.001] += 3000  # Заправки
+    steps[events > 0.9995] -= 1500  # Сливы
+    lls = np.clip(2000 + np.cumsum(steps), 0, 8000).astype(int)
+
+    data = pd.DataFrame({
+        'message_id': rng.integers(0, 2 ** 62, size=n).astype(str),
+        'track_id': rng.integers(10 ** 9, 3 * 10 ** 9, size=n).astype(str),
+        'terminal_id': terminal.astype(str),
+        'lat': 57.6 + rng.random(n) * 0.3,
+        'lon': 38.5 + rng.random(n) * 1.5,
+        'timestamp': timestamp,
+        'speed': rng.integers(0, 90, size=n),
+        'course': rng.integers(0, 360, size=n),
+        'voltage': '25.4',
+        'motion': 'NULL',
+        'alt': '162',
+        'source': 'DTM',
+        'ignition': rng.integers(0, 2, size=n),
+        'odometer': 'NULL',
+        'satellites': rng.integers(5, 25, size=n),
+        'gsmlevel': 'NULL',
+        'sensors': '{"0": 0, "1": 0, "2": 0, "3": 0}',
+        'externals': '{}',
+        'outputs': '{"1": 0, "2": 0, "3": 0, "4": 0}',
+        'can_data': '{"LLS_0": ' + pd.Series(lls).astype(str)
+                    + ', "xLLS_71": ' + pd.Series(lls).astype(str) + '}',
+        'temperature': '{}',
+        'created': '2023-08-06 09:59:32.942553',
+    })
+    data.to_csv(path, index=False)
+
+
+def generate_ejudge(n, path, teams=200, problems=12, seed=0):
+    """Генерирует CSV файл в схеме выгрузок ejudge (lab1_1_2, lab1_3).
+
+    Args:
+        n (int): Количество строк.
+        path (str): Путь к создаваемому файлу.
+        teams (int): Количество команд.
+        problems (int): Количество задач.
+        seed (int): Начальное значение генератора случайных чисел.
+    """
+    rng = np.random.default_rng(seed)
+    user = rng.integers(0, teams, size=n)
+    minutes = np.sort(rng.integers(0, 300, size=n))
+
+    data = pd.DataFrame({
+        'User_Id': user,
+        'User_Login': 'team' + pd.Series(user).astype(str),
+        'User_Inv': np.where(rng.random(n) < 0.02, 'I', ''),
+        'Lang': rng.choice(['python3', 'g++', 'java', 'pypy3'], size=n),
+        'Score': rng.integers(-1, 101, size=n),
+        'User_Name': 'Школа ' + pd.Series(user % 50).astype(str)
+                     + ': команда ' + pd.Series(user).astype(str),
+        'Prob': rng.choice([chr(ord('A') + i) for i in range(problems)], size=n),
+        'Stat_Short': rng.choice(['OK', 'WA', 'TL', 'RT', 'CE'], size=n,
+                                 p=[0.3, 0.4, 0.15, 0.1, 0.05]),
+        'Dur_Hour': minutes // 60,
+        'Dur_Min': minutes % 60,
+    })
+    data.to_csv(path, index=False, sep=';')
+
+
+# ========================== Замеры ==========================
+
+def max_rss_mb():
+    """Возвращает пиковый RSS процесса в мегабайтах."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В macOS ru_maxrss измеряется в байтах, в Linux — в килобайтах
+    return rss / 2 ** 20 if sys.platform == 'darwin' else rss / 2 ** 10
+
+
+def measure(results, stage, rows, fn, trace_memory=False):
+    """Выполняет этап и добавляет замер в список результатов.
+
+    Args:
+        results (list): Список, в который добавляется замер.
+        stage (str): Название этапа.
+        rows (int): Количество обработанных строк (для расчёта пропускной способности).
+        fn (callable): Функция без аргументов, выполняющая этап.
+        trace_memory (bool): Если True, замеряет пик выделенной памяти через tracemalloc.
+    Return:
+        Результат fn().
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    value = fn()
+    seconds = time.perf_counter() - start
+
+    record = {
+        'stage': stage,
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds > 0 else None,
+        'peak_rss_mb': max_rss_mb(),
+    }
+    if trace_memory:
+        record['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+    results.append(record)
+    print(f"{stage:<28} {rows:>10} строк {seconds:>10.3f} с "
+          f"{record['peak_rss_mb']:>10.1f} МБ RSS")
+    return value
+
+
+@contextlib.contextmanager
+def serve_directory(directory):
+    """Поднимает локальный HTTP сервер для загрузчиков, работающих по URL."""
+    class QuietHandler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def bench_telematics(n, workdir, results, trace_memory):
+    """Бенчмарк конвейера lab5: load_data, literal_eval, detect_windows."""
+    lab5 = import_lab('lab5/lab5.py')
+    path = os.path.join(workdir, f'telematics_{n}.csv')
+    generate_telematics(n, path)
+
+    data = measure(results, 'lab5.load_data', n,
+                   lambda: lab5.load_data(path), trace_memory)
+    can_data = measure(results, 'ast.literal_eval', n,
+                       lambda: data['can_data'].apply(ast.literal_eval), trace_memory)
+
+    # detect_windows работает с данными одного терминала
+    terminal_id = data['terminal_id'].iloc[0]
+    single = data[data['terminal_id'] == terminal_id].copy()
+    single['LLS_0_liters'] = can_data[single.index].map(
+        lambda x: x.get('LLS_0')) * 0.01
+    single['datetime'] = pd.to_datetime(single['timestamp'], unit='s')
+    measure(results, 'lab5.detect_windows', len(single),
+            lambda: lab5.detect_windows(single), trace_memory)
+
+
+def bench_contest(n, workdir, results, trace_memory):
+    """Бенчмарк конвейера lab1_3: load_data (по HTTP), calculate_team_results."""
+    lab1_3 = import_lab('lab1/lab1_3.py')
+    filename = f'ejudge_{n}.csv'
+    generate_ejudge(n, os.path.join(workdir, filename))
+
+    with serve_directory(workdir) as base_url:
+        data = measure(results, 'lab1_3.load_data', n,
+                       lambda: lab1_3.load_data(f'{base_url}/{filename}'), trace_memory)
+    measure(results, 'lab1_3.calculate_team_results', n,
+            lambda: lab1_3.calculate_team_results(data), trace_memory)
+
+
+def bench_database(n, results, trace_memory):
+    """Бенчмарк ConnectDB.insert на локальном PostgreSQL (если он настроен)."""
+    dbname = os.environ.get('BENCH_PG_DBNAME')
+    if not dbname:
+        print("ConnectDB.insert пропущен: не задана переменная BENCH_PG_DBNAME")
+        return
+
+    lab3 = import_lab('lab3/lab3.py')
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = lab3.ConnectDB(
+            dbname=dbname,
+            user=os.environ.get('BENCH_PG_USER', 'postgres'),
+            password=os.environ.get('BENCH_PG_PASSWORD', ''),
+            host=os.environ.get('BENCH_PG_HOST', 'localhost'),
+            port=os.environ.get('BENCH_PG_PORT', '5432'),
+        )
+    try:
+        db.cur.execute(
+            "CREATE TEMPORARY TABLE bench_coordinates (x INTEGER, y INTEGER)")
+        rng = np.random.default_rng(0)
+        points = rng.integers(1, 100, size=(n, 2)).tolist()
+
+        def insert_all():
+            # ConnectDB.insert печатает сообщение после каждой вставки
+            with contextlib.redirect_stdout(io.StringIO()):
+                for x, y in points:
+                    db.insert(
+                        "INSERT INTO bench_coordinates (x, y) VALUES (%s, %s)", (x, y))
+
+        measure(results, 'lab3.ConnectDB.insert', n, insert_all, trace_memory)
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.close()
+
+
+# ========================== Хранение результатов ==========================
+
+def git_commit():
+    """Возвращает короткий хеш текущего коммита или 'unknown'."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def save_results(results):
+    """Сохраняет результаты в JSON и возвращает путь к файлу."""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    commit = git_commit()
+    path = os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'commit': commit, 'python': sys.version.split()[0],
+                   'results': results}, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def compare_with_previous(results, current_path):
+    """Печатает изменение времени этапов относительно предыдущего запуска."""
+    previous = sorted(p for p in glob.glob(os.path.join(RESULTS_DIR, '*.json'))
+                      if p != current_path)
+    if not previous:
+        return
+
+    with open(previous[-1], encoding='utf-8') as f:
+        baseline = {(r['stage'], r['rows']): r for r in json.load(f)['results']}
+
+    print(f"\nСравнение с {os.path.basename(previous[-1])}:")
+    for record in results:
+        old = baseline.get((record['stage'], record['rows']))
+        if old and old['seconds'] > 0:
+            ratio = record['seconds'] / old['seconds']
+            print(f"{record['stage']:<28} {record['rows']:>10} строк x{ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000],
+                        help='Количество строк синтетических данных (до 10M).')
+    parser.add_argument('--db-rows', type=int, default=1000,
+                        help='Количество вставок для ConnectDB.insert.')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Замерять пик выделенной памяти через tracemalloc (медленнее).')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            bench_telematics(n, workdir, results, args.trace_memory)
+            bench_contest(n, workdir, results, args.trace_memory)
+    bench_database(args.db_rows, results, args.trace_memory)
+
+    path = save_results(results)
+    print(f"\nРезультаты сохранены в {path}")
+    compare_with_previous(results, path)
+
+
+if __name__ == "__main__":
+    main()
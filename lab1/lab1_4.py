@@ -1,6 +1,8 @@
 # Веселов С.С.
 import csv
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import os
 import requests
 import zipfile
 import io
@@ -9,15 +11,14 @@ import io
 url = "https://ejudge.179.ru/tasks/python/2022b/attachments/data-9776-2019-01-21.zip"
 
 
-def load_data(url):
-    """Скачивает и извлекает данные из ZIP-архива.
+def load_raw(url):
+    """Скачивает ZIP-архив и возвращает распакованное содержимое CSV-файла.
 
     Args:
         url (str): Ссылка на ZIP-архив с CSV-файлом.
 
     Returns:
-        list[dict]: Список словарей, где каждый словарь представляет строку из CSV-файла.
-                   Ключи словаря — названия столбцов, значения — соответствующие данные.
+        bytes: Содержимое CSV-файла в кодировке cp1251.
     """
     response = requests.get(url)
     response.raise_for_status()  # Проверяем, что запрос успешен
@@ -26,16 +27,38 @@ def load_data(url):
     with zipfile.ZipFile(io.BytesIO(response.content)) as zip_file:
         # Предполагаем, что в архиве только один файл
         csv_filename = zip_file.namelist()[0]
-        with zip_file.open(csv_filename) as csv_file:
-            # Читаем CSV-файл с кодировкой cp1251 и разделителем ';'
-            reader = csv.DictReader(
-                io.TextIOWrapper(csv_file, encoding='cp1251'),
-                delimiter=';',
-                quotechar='"'
-            )
-            data = [row for row in reader]
+        return zip_file.read(csv_filename)
 
-    return data
+
+def parse_csv(content):
+    """Разбирает содержимое CSV-файла в список словарей.
+
+    Args:
+        content (bytes): Содержимое CSV-файла в кодировке cp1251.
+
+    Returns:
+        list[dict]: Список словарей, где каждый словарь представляет строку из CSV-файла.
+    """
+    # Читаем CSV-файл с кодировкой cp1251 и разделителем ';'
+    reader = csv.DictReader(
+        io.TextIOWrapper(io.BytesIO(content), encoding='cp1251'),
+        delimiter=';',
+        quotechar='"'
+    )
+    return [row for row in reader]
+
+
+def load_data(url):
+    """Скачивает и извлекает данные из ZIP-архива.
+
+    Args:
+        url (str): Ссылка на ZIP-архив с CSV-файлом.
+
+    Returns:
+        list[dict]: Список словарей, где каждый словарь представляет строку из CSV-файла.
+                   Ключи словаря — названия столбцов, значения — соответствующие данные.
+    """
+    return parse_csv(load_raw(url))
 
 
 def count_access_points(data):
@@ -73,6 +96,107 @@ def count_access_points(data):
     return district_counts
 
 
+def split_shards(content, num_shards):
+    """Разбивает содержимое CSV-файла на диапазоны байтов, выровненные по границам строк.
+
+    Первая строка (заголовок) в шарды не входит. Предполагается, что значения
+    полей не содержат переводов строк.
+
+    Args:
+        content (bytes): Содержимое CSV-файла.
+        num_shards (int): Желаемое количество шардов.
+
+    Returns:
+        tuple: Кортеж из двух элементов:
+            - header (bytes): Строка заголовка вместе с переводом строки.
+            - shards (list[tuple[int, int]]): Список диапазонов (начало, конец) в байтах.
+    """
+    header_end = content.find(b"\n") + 1
+    if header_end == 0:
+        # Файл состоит только из заголовка
+        return content, []
+
+    header = content[:header_end]
+    size = len(content)
+    shard_size = max(1, (size - header_end) // max(1, num_shards))
+
+    shards = []
+    start = header_end
+    while start < size:
+        # Сдвигаем конец шарда до ближайшего перевода строки
+        end = content.find(b"\n", min(start + shard_size, size) - 1)
+        end = size if end == -1 else end + 1
+        shards.append((start, end))
+        start = end
+
+    return header, shards
+
+
+def _count_shard(chunk):
+    """Подсчитывает точки доступа в одном шарде (выполняется в дочернем процессе).
+
+    Args:
+        chunk (bytes): Заголовок CSV-файла, за которым следуют строки шарда.
+
+    Returns:
+        dict: Частичный результат подсчёта для шарда.
+    """
+    return dict(count_access_points(parse_csv(chunk)))
+
+
+def merge_counts(partials):
+    """Объединяет частичные результаты подсчёта попарным (древовидным) слиянием.
+
+    Args:
+        partials (list[dict]): Частичные результаты подсчёта по шардам.
+
+    Returns:
+        dict: Словарь, где ключ — название района (str), а значение — количество точек доступа (int).
+    """
+    level = [defaultdict(int, partial) for partial in partials] or [defaultdict(int)]
+
+    while len(level) > 1:
+        next_level = []
+        for i in range(0, len(level) - 1, 2):
+            left, right = level[i], level[i + 1]
+            # Сливаем меньший словарь в больший
+            if len(left) < len(right):
+                left, right = right, left
+            for district, count in right.items():
+                left[district] += count
+            next_level.append(left)
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level = next_level
+
+    return level[0]
+
+
+def count_access_points_sharded(content, workers=None):
+    """Подсчитывает количество точек доступа для каждого района в пуле процессов.
+
+    Содержимое CSV-файла делится на шарды по границам строк, каждый шард
+    обрабатывается функцией count_access_points в отдельном процессе, а
+    частичные результаты объединяются функцией merge_counts. Результат
+    совпадает с последовательной версией.
+
+    Args:
+        content (bytes): Распакованное содержимое CSV-файла (см. load_raw).
+        workers (int, optional): Количество процессов. По умолчанию — число ядер.
+
+    Returns:
+        dict: Словарь, где ключ — название района (str), а значение — количество точек доступа (int).
+    """
+    workers = workers or os.cpu_count() or 1
+    header, shards = split_shards(content, workers)
+    chunks = (header + content[start:end] for start, end in shards)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        partials = list(executor.map(_count_shard, chunks))
+
+    return merge_counts(partials)
+
+
 def print_results(district_counts):
     """Выводит результаты подсчёта точек доступа по районам.
 
@@ -92,12 +216,20 @@ def print_results(district_counts):
         print(f"{district}: {count}")
 
 
-def main():
-    """Основная функция программы."""
-    data = load_data(url)
+def main(workers=None):
+    """Основная функция программы.
+
+    Args:
+        workers (int, optional): Если задано, подсчёт выполняется в пуле из
+                                 указанного числа процессов (count_access_points_sharded).
+    """
+    if workers:
+        district_counts = count_access_points_sharded(load_raw(url), workers)
+    else:
+        data = load_data(url)
 
-    # Подсчитываем количество точек доступа для каждого района
-    district_counts = count_access_points(data)
+        # Подсчитываем количество точек доступа для каждого района
+        district_counts = count_access_points(data)
 
     # Выводим результаты
     print_results(district_counts)
@@ -0,0 +1,82 @@
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Датчики уровня топлива, которые встречаются в can_data
+SENSORS = ('LLS_0', 'xLLS_71')
+# Папка с тарировочными таблицами: <terminal_id>.csv со столбцами sensor,raw,liters
+CALIBRATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'calibration')
+# Линейный коэффициент для датчиков без тарировочной таблицы
+DEFAULT_FACTOR = 0.01
+
+
+@functools.lru_cache(maxsize=None)
+def load_tables(terminal_id, directory=CALIBRATION_DIR):
+    """Загружает тарировочные таблицы терминала (один раз, далее из кэша).
+
+    Args:
+        terminal_id (str): ID терминала.
+        directory (str): Папка с таблицами.
+    Return:
+        Словарь {датчик: (сырые значения, литры)}, где массивы отсортированы по сырым значениям.
+        Если файла нет, возвращается пустой словарь.
+    """
+    path = os.path.join(directory, f'{terminal_id}.csv')
+    if not os.path.exists(path):
+        return {}
+
+    table = pd.read_csv(path, dtype={'sensor': str})
+    tables = {}
+    for sensor, points in table.groupby('sensor'):
+        points = points.sort_values('raw').drop_duplicates('raw')
+        tables[sensor] = (points['raw'].to_numpy(dtype=float),
+                          points['liters'].to_numpy(dtype=float))
+    return tables
+
+
+def to_liters(values, terminal_id, sensor='LLS_0', directory=CALIBRATION_DIR):
+    """Переводит показания датчика в литры по кусочно-линейной тарировочной таблице.
+
+    Значения за пределами таблицы ограничиваются её крайними точками, пропуски
+    остаются пропусками. Без таблицы используется коэффициент DEFAULT_FACTOR.
+
+    Args:
+        values (array-like): Сырые показания датчика.
+        terminal_id (str): ID терминала.
+        sensor (str): Название датчика.
+        directory (str): Папка с таблицами.
+    Return:
+        np.ndarray с объёмом топлива в литрах.
+    """
+    values = np.asarray(values, dtype=float)
+    table = load_tables(str(terminal_id), directory).get(sensor)
+    if table is None:
+        return values * DEFAULT_FACTOR
+
+    raw, liters = table
+    return np.interp(values, raw, liters)
+
+
+def calibrate(data, terminal_id, sensors=SENSORS, directory=CALIBRATION_DIR):
+    """Добавляет в DataFrame столбцы <датчик>_liters для всех найденных датчиков.
+
+    Используются столбцы <датчик>_interpolated, а если их нет — сырые <датчик>.
+
+    Args:
+        data (pd.DataFrame): Данные одного терминала.
+        terminal_id (str): ID терминала.
+        sensors (tuple[str]): Названия датчиков.
+        directory (str): Папка с таблицами.
+    Return:
+        Тот же DataFrame с добавленными столбцами.
+    """
+    for sensor in sensors:
+        source = f'{sensor}_interpolated' if f'{sensor}_interpolated' in data else sensor
+        if source not in data:
+            continue
+        data[f'{sensor}_liters'] = to_liters(
+            data[source], terminal_id, sensor, directory)
+    return data
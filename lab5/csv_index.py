@@ -0,0 +1,134 @@
+import io
+import json
+import mmap
+import os
+
+import pandas as pd
+
+
+# Номера столбцов terminal_id и timestamp в выгрузке телематики
+TERMINAL_COLUMN = 2
+TIMESTAMP_COLUMN = 5
+# Первые столбцы выгрузки не содержат запятых, поэтому строку достаточно
+# разрезать на TIMESTAMP_COLUMN + 1 частей
+_SPLIT_LIMIT = TIMESTAMP_COLUMN + 1
+
+
+def index_path(filepath):
+    """Возвращает путь к файлу индекса рядом с CSV файлом."""
+    return filepath + '.idx.json'
+
+
+def build_index(filepath):
+    """Строит индекс смещений строк CSV файла по (terminal_id, час).
+
+    Файл отображается в память и просматривается один раз. Соседние строки
+    одного ключа объединяются в один диапазон байтов.
+
+    Args:
+        filepath (str): Путь к CSV файлу.
+    Return:
+        Словарь {terminal_id: {час: [[начало, конец], ...]}}, где час — timestamp // 3600.
+    """
+    index = {}
+
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        mm.readline()  # Пропускаем заголовок
+        start = mm.tell()
+        line = mm.readline()
+
+        while line:
+            end = start + len(line)
+            fields = line.split(b',', _SPLIT_LIMIT)
+            try:
+                terminal_id = fields[TERMINAL_COLUMN].strip(b'"').decode()
+                hour = str(int(fields[TIMESTAMP_COLUMN].strip(b'"')) // 3600)
+            except (IndexError, ValueError):
+                # Пустые или повреждённые строки не индексируем
+                start, line = end, mm.readline()
+                continue
+
+            ranges = index.setdefault(terminal_id, {}).setdefault(hour, [])
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] = end
+            else:
+                ranges.append([start, end])
+
+            start, line = end, mm.readline()
+
+    return index
+
+
+def load_index(filepath):
+    """Загружает индекс из файла рядом с CSV файлом или строит его при первом чтении.
+
+    Индекс перестраивается, если размер или время изменения CSV файла не
+    совпадают с сохранёнными.
+
+    Args:
+        filepath (str): Путь к CSV файлу.
+    Return:
+        Словарь {terminal_id: {час: [[начало, конец], ...]}}.
+    """
+    stat = os.stat(filepath)
+    path = index_path(filepath)
+
+    try:
+        with open(path, encoding='utf-8') as f:
+            sidecar = json.load(f)
+        if sidecar['size'] == stat.st_size and sidecar['mtime_ns'] == stat.st_mtime_ns:
+            return sidecar['index']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    index = build_index(filepath)
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                      'index': index}, f)
+    except OSError as e:
+        print(f"Не удалось сохранить индекс {path}: {e}")
+
+    return index
+
+
+def read_slice(filepath, terminal_id=None, start=None, end=None):
+    """Читает из CSV файла только строки нужного терминала и интервала времени.
+
+    Args:
+        filepath (str): Путь к CSV файлу.
+        terminal_id (str): ID терминала. Если None, читаются все терминалы.
+        start (int): Начало интервала (unix timestamp, включительно).
+        end (int): Конец интервала (unix timestamp, включительно).
+    Return:
+        DataFrame с выбранными строками в исходном порядке файла.
+    """
+    index = load_index(filepath)
+    terminals = [str(terminal_id)] if terminal_id is not None else list(index)
+    first_hour = start // 3600 if start is not None else None
+    last_hour = end // 3600 if end is not None else None
+
+    ranges = []
+    for terminal in terminals:
+        for hour, hour_ranges in index.get(terminal, {}).items():
+            hour = int(hour)
+            if first_hour is not None and hour < first_hour:
+                continue
+            if last_hour is not None and hour > last_hour:
+                continue
+            ranges.extend(hour_ranges)
+    ranges.sort()
+
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header = mm.readline()
+        chunks = [header] + [mm[s:e] for s, e in ranges]
+
+    data = pd.read_csv(io.BytesIO(b''.join(chunks)))
+
+    # Индекс имеет точность до часа, поэтому границы интервала уточняем
+    if start is not None:
+        data = data[data['timestamp'] >= start]
+    if end is not None:
+        data = data[data['timestamp'] <= end]
+
+    return data
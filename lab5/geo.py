@@ -0,0 +1,215 @@
+import json
+
+import numpy as np
+
+
+class Geofence:
+    """Геозона — многоугольник в координатах lat/lon.
+
+    Attributes:
+        name (str): Название зоны.
+        lat (np.ndarray): Широты вершин.
+        lon (np.ndarray): Долготы вершин.
+        bbox (tuple): Ограничивающий прямоугольник (min_lat, max_lat, min_lon, max_lon).
+    """
+
+    def __init__(self, name, lat, lon):
+        """Инициализирует геозону.
+
+        Args:
+            name (str): Название зоны.
+            lat (array-like): Широты вершин.
+            lon (array-like): Долготы вершин.
+        """
+        self.name = name
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.bbox = (self.lat.min(), self.lat.max(), self.lon.min(), self.lon.max())
+
+    def contains(self, lat, lon):
+        """Проверяет попадание точек в зону (см. points_in_polygon)."""
+        return points_in_polygon(lat, lon, self.lat, self.lon)
+
+
+def load_geofences(path):
+    """Загружает геозоны из GeoJSON файла (Polygon и MultiPolygon, внешние контуры).
+
+    Название зоны берётся из свойства name, иначе используется номер объекта.
+
+    Args:
+        path (str): Путь к GeoJSON файлу.
+    Return:
+        Список Geofence.
+    """
+    with open(path, encoding='utf-8') as f:
+        collection = json.load(f)
+
+    zones = []
+    for number, feature in enumerate(collection.get('features', [])):
+        geometry = feature.get('geometry') or {}
+        name = (feature.get('properties') or {}).get('name', str(number))
+        if geometry.get('type') == 'Polygon':
+            polygons = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiPolygon':
+            polygons = geometry['coordinates']
+        else:
+            continue
+
+        for polygon in polygons:
+            # В GeoJSON координаты задаются как [lon, lat]
+            ring = np.asarray(polygon[0], dtype=float)
+            zones.append(Geofence(name, ring[:, 1], ring[:, 0]))
+
+    return zones
+
+
+def points_in_polygon(lat, lon, polygon_lat, polygon_lon):
+    """Векторная проверка попадания точек в многоугольник методом трассировки луча.
+
+    Цикл идёт по рёбрам многоугольника, а все точки обрабатываются одной операцией.
+
+    Args:
+        lat (array-like): Широты точек.
+        lon (array-like): Долготы точек.
+        polygon_lat (np.ndarray): Широты вершин многоугольника.
+        polygon_lon (np.ndarray): Долготы вершин многоугольника.
+    Return:
+        np.ndarray[bool] — True для точек внутри многоугольника.
+    """
+    y = np.asarray(lat, dtype=float)
+    x = np.asarray(lon, dtype=float)
+    inside = np.zeros(len(x), dtype=bool)
+
+    xj, yj = polygon_lon[-1], polygon_lat[-1]
+    for xi, yi in zip(polygon_lon, polygon_lat):
+        crosses = (yi > y) != (yj > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = (xj - xi) * (y - yi) / (yj - yi) + xi
+        inside ^= crosses & (x < x_cross)
+        xj, yj = xi, yi
+
+    return inside
+
+
+class GridIndex:
+    """Сеточный индекс точек: точки сортируются по номеру ячейки сетки.
+
+    Запрос по прямоугольнику сводится к бинарному поиску диапазонов ячеек
+    в каждой строке сетки.
+
+    Attributes:
+        cell_size (float): Размер ячейки в градусах.
+        order (np.ndarray): Номера точек, отсортированные по ключу ячейки.
+        keys (np.ndarray): Отсортированные ключи ячеек.
+    """
+
+    # Сдвиг, чтобы номера столбцов сетки были неотрицательными
+    _COLUMN_OFFSET = 1 << 20
+    _ROW_STRIDE = 1 << 21
+
+    def __init__(self, lat, lon, cell_size=0.01):
+        """Строит индекс.
+
+        Args:
+            lat (array-like): Широты точек.
+            lon (array-like): Долготы точек.
+            cell_size (float, optional): Размер ячейки в градусах. По умолчанию 0.01 (~1 км).
+        """
+        self.cell_size = cell_size
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+
+        # Точки без координат в индекс не попадают
+        valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        keys = self._key(self._cell(lat[valid]), self._cell(lon[valid]))
+        sort = np.argsort(keys, kind='stable')
+        self.order = valid[sort]
+        self.keys = keys[sort]
+
+    def _cell(self, values):
+        return np.floor(np.asarray(values) / self.cell_size).astype(np.int64)
+
+    def _key(self, row, column):
+        return row * self._ROW_STRIDE + column + self._COLUMN_OFFSET
+
+    def query_bbox(self, min_lat, max_lat, min_lon, max_lon):
+        """Возвращает номера точек из ячеек, пересекающих прямоугольник.
+
+        Результат — кандидаты: точки у границ могут лежать вне прямоугольника.
+
+        Return:
+            np.ndarray с номерами точек.
+        """
+        first_row, last_row = self._cell(min_lat), self._cell(max_lat)
+        first_column, last_column = self._cell(min_lon), self._cell(max_lon)
+
+        rows = np.arange(first_row, last_row + 1)
+        if not len(rows) or not len(self.keys):
+            return np.empty(0, dtype=np.int64)
+
+        starts = np.searchsorted(self.keys, self._key(rows, first_column), side='left')
+        ends = np.searchsorted(self.keys, self._key(rows, last_column), side='right')
+        return np.concatenate([self.order[s:e] for s, e in zip(starts, ends)])
+
+
+def zone_membership(lat, lon, zones, index=None):
+    """Определяет для каждой точки, в какие геозоны она попадает.
+
+    Args:
+        lat (array-like): Широты точек.
+        lon (array-like): Долготы точек.
+        zones (list[Geofence]): Геозоны.
+        index (GridIndex): Индекс этих же точек. По умолчанию строится заново.
+    Return:
+        np.ndarray[bool] формы (число точек, число зон).
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if index is None:
+        index = GridIndex(lat, lon)
+
+    membership = np.zeros((len(lat), len(zones)), dtype=bool)
+    for number, zone in enumerate(zones):
+        candidates = index.query_bbox(*zone.bbox)
+        if len(candidates):
+            membership[candidates, number] = zone.contains(
+                lat[candidates], lon[candidates])
+
+    return membership
+
+
+def attach_zones(events, zones):
+    """Добавляет к таблице событий столбец zone — название первой зоны, в которую попало начало события.
+
+    Args:
+        events (pd.DataFrame): Таблица событий со столбцами lat и lon (например, результат solve_fleet).
+        zones (list[Geofence]): Геозоны.
+    Return:
+        Копия таблицы со столбцом zone (None, если событие вне всех зон).
+    """
+    events = events.copy()
+    membership = zone_membership(events['lat'], events['lon'], zones)
+    names = np.array([zone.name for zone in zones] + [None], dtype=object)
+
+    # Для точек вне зон argmax указывает на фиктивную последнюю колонку
+    padded = np.hstack([membership, np.ones((len(events), 1), dtype=bool)])
+    events['zone'] = names[padded.argmax(axis=1)]
+    return events
+
+
+def events_outside(events, zones, event='refill'):
+    """Возвращает события данного типа вне всех геозон (например, заправки вне АЗС)."""
+    selected = events[events['event'] == event]
+    membership = zone_membership(selected['lat'], selected['lon'], zones)
+    return selected[~membership.any(axis=1)]
+
+
+def events_inside(events, zones, zone_name, event='overspeed'):
+    """Возвращает события данного типа внутри геозон с названием zone_name."""
+    named = [zone for zone in zones if zone.name == zone_name]
+    selected = events[events['event'] == event]
+    if not named:
+        return selected.iloc[0:0]
+
+    membership = zone_membership(selected['lat'], selected['lon'], named)
+    return selected[membership.any(axis=1)]
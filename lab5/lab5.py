@@ -1,11 +1,35 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import ast
 
+from calibration import SENSORS, calibrate
+from csv_index import read_slice
+from geo import events_outside, load_geofences
+from profiling import StageProfiler, print_reports
+from resample import resample_terminal
+from smoothing import smooth
+from trips import summarize_trips
 
-def load_data(filepath):
-    """Загружает данные из CSV файла."""
-    data = pd.read_csv(filepath)
+
+def load_data(filepath, terminal_id=None, start=None, end=None):
+    """Загружает данные из CSV файла.
+
+    Если задан terminal_id или интервал времени, читаются только нужные
+    диапазоны байтов по индексу из csv_index (индекс строится при первом чтении).
+
+    Args:
+        filepath (str): Путь к CSV файлу.
+        terminal_id (str): ID терминала. По умолчанию читаются все терминалы.
+        start (int): Начало интервала (unix timestamp). По умолчанию не ограничено.
+        end (int): Конец интервала (unix timestamp). По умолчанию не ограничено.
+    Return:
+        DataFrame, отсортированный по временной метке.
+    """
+    if terminal_id is None and start is None and end is None:
+        data = pd.read_csv(filepath)
+    else:
+        data = read_slice(filepath, terminal_id, start, end)
     # Сортируем данные по временной метке
     data = data.sort_values(by='timestamp')
     return data
@@ -68,7 +92,64 @@ def detect_windows(data, threshold_liters=5, merge_threshold_seconds=300, detect
     return merged_windows
 
 
-def solve_task(data, terminal_id, draw_refill=True, draw_drain=True, refill_threshold_liters=5, drain_threshold_liters=5, refill_merge_threshold_seconds=300, drain_merge_threshold_seconds=300):
+def prepare_terminal(filtered_data, terminal_id, profiler=None, smoothing=None):
+    """Готовит данные одного терминала к детектированию.
+
+    Разбирает can_data, интерполирует показания датчиков, переводит их в литры,
+    при необходимости сглаживает LLS_0_liters и добавляет столбец datetime.
+
+    Args:
+        filtered_data (pd.DataFrame): Данные одного терминала.
+        terminal_id (str): ID терминала.
+        profiler (StageProfiler): Профайлер этапов. По умолчанию замеры выключены.
+        smoothing (str | tuple): Фильтр уровня топлива (см. smoothing.smooth).
+    Return:
+        DataFrame с подготовленными данными или None, если данных уровня топлива нет.
+    """
+    if profiler is None:
+        profiler = StageProfiler(terminal_id)
+
+    with profiler.stage('literal_eval', rows=len(filtered_data)):
+        try:
+            filtered_data['can_data'] = filtered_data['can_data'].apply(
+                ast.literal_eval)
+        except (ValueError, SyntaxError) as e:
+            print(f"Ошибка при преобразовании can_data: {e}")
+            return None
+
+        # Разворачиваем показания всех датчиков уровня топлива в столбцы
+        can_data = pd.DataFrame(
+            filtered_data['can_data'].tolist(), index=filtered_data.index)
+        for sensor in SENSORS:
+            filtered_data[sensor] = can_data[sensor] if sensor in can_data else None
+
+    if filtered_data['LLS_0'].isnull().all():
+        print("Нет данных для LLS_0 в can_data.")
+        return None
+
+    with profiler.stage('interpolate', rows=len(filtered_data)):
+        for sensor in SENSORS:
+            filtered_data[f'{sensor}_interpolated'] = filtered_data[sensor].astype(float).interpolate(
+                method='linear')
+
+    with profiler.stage('calibrate', rows=len(filtered_data)):
+        # Перевод в литры по тарировочным таблицам терминала (см. calibration.py)
+        calibrate(filtered_data, terminal_id)
+
+    if smoothing is not None:
+        with profiler.stage('smooth', rows=len(filtered_data)):
+            # Подавляем дребезг датчика, чтобы заправки не дробились на мелкие окна
+            filtered_data['LLS_0_liters'] = smooth(
+                filtered_data['LLS_0_liters'], smoothing)
+
+    with profiler.stage('datetime', rows=len(filtered_data)):
+        filtered_data['datetime'] = pd.to_datetime(
+            filtered_data['timestamp'], unit='s')
+
+    return filtered_data
+
+
+def solve_task(data, terminal_id, draw_refill=True, draw_drain=True, refill_threshold_liters=5, drain_threshold_liters=5, refill_merge_threshold_seconds=300, drain_merge_threshold_seconds=300, smoothing=None, resample_rule=None, profiler=None):
     """Обрабатывает данные: строит график и детектирует заправки и/или сливы.
 
     Args:
@@ -80,73 +161,252 @@ def solve_task(data, terminal_id, draw_refill=True, draw_drain=True, refill_thre
         drain_threshold_liters (float): Порог для детектирования слива (в литрах).
         refill_merge_threshold_seconds (int): Максимальная разница в секундах между окнами для объединения заправок.
         drain_merge_threshold_seconds (int): Максимальная разница в секундах между окнами для объединения сливов.
+        smoothing (str | tuple): Фильтр уровня топлива перед детектированием: 'median', 'savgol', 'hampel'
+                                 или кортеж (название, параметры). По умолчанию без сглаживания.
+        resample_rule (str): Шаг сетки для детектирования, например '30s' или '1min'.
+                             По умолчанию детектирование идёт по исходным точкам.
+        profiler (StageProfiler): Профайлер этапов. По умолчанию настраивается по переменным окружения.
+    Return:
+        Отчёт профайлера по этапам (см. StageProfiler.report).
     """
-    if not pd.api.types.is_string_dtype(data['terminal_id']):
-        data['terminal_id'] = data['terminal_id'].astype(str)
+    if profiler is None:
+        profiler = StageProfiler.from_env(terminal_id)
+
+    with profiler.profile():
+        _solve_task(data, terminal_id, profiler,
+                    draw_refill=draw_refill, draw_drain=draw_drain,
+                    refill_threshold_liters=refill_threshold_liters,
+                    drain_threshold_liters=drain_threshold_liters,
+                    refill_merge_threshold_seconds=refill_merge_threshold_seconds,
+                    drain_merge_threshold_seconds=drain_merge_threshold_seconds,
+                    smoothing=smoothing, resample_rule=resample_rule)
 
-    filtered_data = data[data['terminal_id'] == terminal_id]
+    return profiler.report()
+
+
+def _solve_task(data, terminal_id, profiler, draw_refill, draw_drain, refill_threshold_liters, drain_threshold_liters, refill_merge_threshold_seconds, drain_merge_threshold_seconds, smoothing, resample_rule):
+    """Выполняет этапы solve_task, замеряя каждый из них профайлером."""
+    with profiler.stage('filter', rows=len(data)) as stage:
+        if not pd.api.types.is_string_dtype(data['terminal_id']):
+            data['terminal_id'] = data['terminal_id'].astype(str)
+
+        filtered_data = data[data['terminal_id'] == terminal_id]
+        stage['rows_out'] = len(filtered_data)
 
     if filtered_data.empty:
         print(f"Нет данных для terminal_id: {terminal_id}")
         return
 
-    try:
-        filtered_data['can_data'] = filtered_data['can_data'].apply(
-            ast.literal_eval)
-    except (ValueError, SyntaxError) as e:
-        print(f"Ошибка при преобразовании can_data: {e}")
+    filtered_data = prepare_terminal(
+        filtered_data, terminal_id, profiler, smoothing)
+    if filtered_data is None:
         return
 
-    filtered_data['LLS_0'] = filtered_data['can_data'].apply(
-        lambda x: x.get('LLS_0', None))
-
-    if filtered_data['LLS_0'].isnull().all():
-        print("Нет данных для LLS_0 в can_data.")
-        return
+    # Детектирование идёт по ряду на сетке, исходные точки остаются на графике
+    detection_data = filtered_data
+    if resample_rule is not None:
+        with profiler.stage('resample', rows=len(filtered_data)) as stage:
+            detection_data = resample_terminal(
+                filtered_data, resample_rule, agg='mean', columns=('LLS_0_liters',))
+            stage['rows_out'] = len(detection_data)
 
-    filtered_data['LLS_0_interpolated'] = filtered_data['LLS_0'].interpolate(
-        method='linear')
-    filtered_data['LLS_0_liters'] = filtered_data['LLS_0_interpolated'] * 0.01
+    refill_windows = []
+    if draw_refill:
+        with profiler.stage('detect_refill', rows=len(detection_data)) as stage:
+            refill_windows = detect_windows(detection_data, threshold_liters=refill_threshold_liters,
+                                            merge_threshold_seconds=refill_merge_threshold_seconds, detect_refill=True)
+            stage['rows_out'] = len(refill_windows)
 
-    filtered_data['datetime'] = pd.to_datetime(
-        filtered_data['timestamp'], unit='s')
+    drain_windows = []
+    if draw_drain:
+        with profiler.stage('detect_drain', rows=len(detection_data)) as stage:
+            drain_windows = detect_windows(detection_data, threshold_liters=drain_threshold_liters,
+                                           merge_threshold_seconds=drain_merge_threshold_seconds, detect_refill=False)
+            stage['rows_out'] = len(drain_windows)
 
-    plt.figure(figsize=(20, 5))
-    plt.plot(filtered_data['datetime'], filtered_data['LLS_0_liters'],
-             label='Уровень топлива (литры)', color='blue', marker='o')
+    with profiler.stage('plot', rows=len(filtered_data)):
+        plt.figure(figsize=(20, 5))
+        plt.plot(filtered_data['datetime'], filtered_data['LLS_0_liters'],
+                 label='Уровень топлива (литры)', color='blue', marker='o')
 
-    if draw_refill:
-        refill_windows = detect_windows(filtered_data, threshold_liters=refill_threshold_liters,
-                                        merge_threshold_seconds=refill_merge_threshold_seconds, detect_refill=True)
         for window in refill_windows:
             start_idx, end_idx, total_change = window
-            plt.plot(filtered_data['datetime'].iloc[start_idx:end_idx + 1],
-                     filtered_data['LLS_0_liters'].iloc[start_idx:end_idx + 1],
+            plt.plot(detection_data['datetime'].iloc[start_idx:end_idx + 1],
+                     detection_data['LLS_0_liters'].iloc[start_idx:end_idx + 1],
                      color='green', label='Заправка' if start_idx == refill_windows[0][0] else "")
             print(
-                f"Заправка обнаружена с {filtered_data['datetime'].iloc[start_idx]} по {filtered_data['datetime'].iloc[end_idx]}, суммарный рост: {total_change:.2f} литров")
+                f"Заправка обнаружена с {detection_data['datetime'].iloc[start_idx]} по {detection_data['datetime'].iloc[end_idx]}, суммарный рост: {total_change:.2f} литров")
 
-    if draw_drain:
-        drain_windows = detect_windows(filtered_data, threshold_liters=drain_threshold_liters,
-                                       merge_threshold_seconds=drain_merge_threshold_seconds, detect_refill=False)
         for window in drain_windows:
             start_idx, end_idx, total_change = window
-            plt.plot(filtered_data['datetime'].iloc[start_idx:end_idx + 1],
-                     filtered_data['LLS_0_liters'].iloc[start_idx:end_idx + 1],
+            plt.plot(detection_data['datetime'].iloc[start_idx:end_idx + 1],
+                     detection_data['LLS_0_liters'].iloc[start_idx:end_idx + 1],
                      color='red', label='Слив' if start_idx == drain_windows[0][0] else "")
             print(
-                f"Слив обнаружен с {filtered_data['datetime'].iloc[start_idx]} по {filtered_data['datetime'].iloc[end_idx]}, суммарное снижение: {total_change:.2f} литров")
-
-    plt.title(
-        f'График уровня топлива от времени для terminal_id: {terminal_id}')
-    plt.xlabel('Время')
-    plt.ylabel('Уровень топлива (литры)')
-    plt.legend()
-    plt.grid(True)
+                f"Слив обнаружен с {detection_data['datetime'].iloc[start_idx]} по {detection_data['datetime'].iloc[end_idx]}, суммарное снижение: {total_change:.2f} литров")
+
+        plt.title(
+            f'График уровня топлива от времени для terminal_id: {terminal_id}')
+        plt.xlabel('Время')
+        plt.ylabel('Уровень топлива (литры)')
+        plt.legend()
+        plt.grid(True)
+
+    # Время ожидания закрытия окна графика в профиль не входит
     plt.show()
 
 
-def main():
+# Столбцы сводной таблицы событий по парку
+FLEET_COLUMNS = ['terminal_id', 'event', 'start', 'end', 'value', 'lat', 'lon']
+
+
+def split_by_terminal(data):
+    """Разбивает данные на терминалы за один проход: сортировка и разрезание по границам.
+
+    Args:
+        data (pd.DataFrame): DataFrame с данными нескольких терминалов.
+    Return:
+        Словарь {terminal_id: DataFrame}, данные каждого терминала отсортированы по времени.
+    """
+    if data.empty:
+        return {}
+
+    if not pd.api.types.is_string_dtype(data['terminal_id']):
+        data['terminal_id'] = data['terminal_id'].astype(str)
+
+    sorted_data = data.sort_values(
+        by=['terminal_id', 'timestamp'], kind='mergesort')
+    ids = sorted_data['terminal_id'].to_numpy()
+    boundaries = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+    starts = np.r_[0, boundaries]
+    ends = np.r_[boundaries, len(ids)]
+
+    return {ids[start]: sorted_data.iloc[start:end] for start, end in zip(starts, ends)}
+
+
+def detect_overspeed(data, speed_limit=60):
+    """Детектирует эпизоды непрерывного превышения скорости.
+
+    Args:
+        data (pd.DataFrame): Данные одного терминала, отсортированные по времени.
+        speed_limit (float): Допустимая скорость (км/ч).
+    Return:
+        Список кортежей (начало эпизода, конец эпизода, максимальная скорость).
+    """
+    over = (data['speed'] > speed_limit).to_numpy()
+    if not over.any():
+        return []
+
+    edges = np.diff(np.r_[0, over.astype(np.int8), 0])
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    # Между эпизодами скорость не выше лимита, поэтому максимум по отрезку [start_i, start_i+1) — максимум эпизода
+    max_speed = np.maximum.reduceat(data['speed'].to_numpy(dtype=float), starts)
+
+    return list(zip(starts.tolist(), ends.tolist(), max_speed.tolist()))
+
+
+def solve_fleet(data, speed_limit=60, refill_threshold_liters=5, drain_threshold_liters=5, refill_merge_threshold_seconds=300, drain_merge_threshold_seconds=300, smoothing=None, resample_rule=None):
+    """Детектирует превышения скорости, заправки и сливы для всех терминалов файла.
+
+    Данные группируются по terminal_id один раз (см. split_by_terminal), а не
+    фильтруются отдельно для каждого терминала.
+
+    Args:
+        data (pd.DataFrame): DataFrame с данными.
+        speed_limit (float): Допустимая скорость (км/ч).
+        refill_threshold_liters (float): Порог для детектирования заправки (в литрах).
+        drain_threshold_liters (float): Порог для детектирования слива (в литрах).
+        refill_merge_threshold_seconds (int): Максимальная разница в секундах между окнами для объединения заправок.
+        drain_merge_threshold_seconds (int): Максимальная разница в секундах между окнами для объединения сливов.
+        smoothing (str | tuple): Фильтр уровня топлива перед детектированием (см. smoothing.smooth).
+        resample_rule (str): Шаг сетки для детектирования заправок и сливов.
+    Return:
+        DataFrame со столбцами FLEET_COLUMNS: value — максимальная скорость (км/ч)
+        для overspeed и суммарное изменение (литры) для refill/drain, lat/lon —
+        координаты начала события (для привязки к геозонам, см. geo.py).
+    """
+    events = []
+
+    for terminal_id, terminal_data in split_by_terminal(data).items():
+        terminal_data = terminal_data.copy()
+        terminal_data['datetime'] = pd.to_datetime(
+            terminal_data['timestamp'], unit='s')
+
+        for start_idx, end_idx, max_speed in detect_overspeed(terminal_data, speed_limit):
+            events.append((terminal_id, 'overspeed', terminal_data['datetime'].iloc[start_idx],
+                           terminal_data['datetime'].iloc[end_idx], max_speed,
+                           terminal_data['lat'].iloc[start_idx], terminal_data['lon'].iloc[start_idx]))
+
+        prepared = prepare_terminal(terminal_data, terminal_id, smoothing=smoothing)
+        if prepared is None:
+            continue
+
+        detection_data = prepared
+        if resample_rule is not None:
+            detection_data = resample_terminal(
+                prepared, resample_rule, agg={'LLS_0_liters': 'mean', 'lat': 'last', 'lon': 'last'})
+
+        for event, detect_refill, threshold, merge_threshold in (
+                ('refill', True, refill_threshold_liters, refill_merge_threshold_seconds),
+                ('drain', False, drain_threshold_liters, drain_merge_threshold_seconds)):
+            windows = detect_windows(detection_data, threshold_liters=threshold,
+                                     merge_threshold_seconds=merge_threshold, detect_refill=detect_refill)
+            for start_idx, end_idx, total_change in windows:
+                events.append((terminal_id, event, detection_data['datetime'].iloc[start_idx],
+                               detection_data['datetime'].iloc[end_idx], total_change,
+                               detection_data['lat'].iloc[start_idx], detection_data['lon'].iloc[start_idx]))
+
+    return pd.DataFrame(events, columns=FLEET_COLUMNS)
+
+
+def fleet_trips(data, gap_seconds=600, smoothing=None):
+    """Восстанавливает поездки всех терминалов с пробегом и расходом топлива.
+
+    Args:
+        data (pd.DataFrame): DataFrame с данными.
+        gap_seconds (int): Разрыв по времени (в секундах), который завершает поездку.
+        smoothing (str | tuple): Фильтр уровня топлива (см. smoothing.smooth).
+    Return:
+        DataFrame со столбцами trips.TRIP_COLUMNS.
+    """
+    frames = []
+    for terminal_id, terminal_data in split_by_terminal(data).items():
+        terminal_data = terminal_data.copy()
+        # Без данных уровня топлива поездки всё равно считаются, но без расхода
+        prepared = prepare_terminal(terminal_data, terminal_id, smoothing=smoothing)
+        frames.append(terminal_data if prepared is None else prepared)
+
+    if not frames:
+        return summarize_trips(data, gap_seconds)
+    return summarize_trips(pd.concat(frames), gap_seconds)
+
+
+def print_fleet_results(events):
+    """Выводит сводную таблицу событий по парку.
+
+    Args:
+        events (pd.DataFrame): Результат solve_fleet.
+    """
+    if events.empty:
+        print("События не обнаружены.")
+        return
+
+    names = {'overspeed': 'Превышение скорости', 'refill': 'Заправка', 'drain': 'Слив'}
+    units = {'overspeed': 'км/ч', 'refill': 'литров', 'drain': 'литров'}
+    for row in events.sort_values(by=['terminal_id', 'start']).itertuples(index=False):
+        print(f"{row.terminal_id}: {names[row.event]} с {row.start} по {row.end}, "
+              f"{row.value:.2f} {units[row.event]}")
+
+
+def main(fleet=False, geofences_path=None):
+    """Основная функция программы.
+
+    Args:
+        fleet (bool): Если True, каждый файл обрабатывается целиком для всех найденных терминалов.
+        geofences_path (str): GeoJSON с геозонами АЗС. Если задан, в режиме fleet
+                              дополнительно выводятся заправки вне АЗС.
+    """
     # Список путей к файлам
     filepaths = [
         'S:/bigdata/lab5/1.csv',
@@ -165,12 +425,45 @@ def main():
         '433100526950514'
     ]
 
-    # Загружаем данные для каждого файла
-    data_list = [load_data(filepath) for filepath in filepaths]
+    # Фильтр уровня топлива для каждого terminal_id (None — без сглаживания)
+    smoothing = {terminal_id: ('hampel', {'window': 7})
+                 for terminal_id in terminal_ids}
+
+    if fleet:
+        # Каждый файл читается один раз
+        events, trips = [], []
+        for filepath in filepaths:
+            data = load_data(filepath)
+            events.append(solve_fleet(data, smoothing=('hampel', {'window': 7})))
+            trips.append(fleet_trips(data, smoothing=('hampel', {'window': 7})))
+        events = pd.concat(events, ignore_index=True)
+        trips = pd.concat(trips, ignore_index=True)
+
+        print_fleet_results(events)
+        print("\nПоездки:")
+        print(trips.to_string(index=False))
+
+        if geofences_path is not None:
+            print("\nЗаправки вне АЗС:")
+            print_fleet_results(events_outside(
+                events, load_geofences(geofences_path), event='refill'))
+        return
+
+    # Загружаем для каждого файла только строки нужного терминала
+    data_list = [load_data(filepath, terminal_id)
+                 for filepath, terminal_id in zip(filepaths, terminal_ids)]
 
     # Обрабатываем данные для каждого terminal_id
+    reports = []
     for data, terminal_id in zip(data_list, terminal_ids):
-        solve_task(data=data, terminal_id=terminal_id)
+        profiler = StageProfiler.from_env(terminal_id)
+        solve_task(data=data, terminal_id=terminal_id,
+                   smoothing=smoothing.get(terminal_id), profiler=profiler)
+        reports.append(profiler.report())
+
+    # Отчёт по этапам выводится, если задана переменная окружения LAB5_PROFILE
+    if any(report['stages'] for report in reports):
+        print_reports(reports)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+import contextlib
+import cProfile
+import os
+import time
+import tracemalloc
+
+
+# LAB5_PROFILE=1 включает замеры этапов, LAB5_PROFILE=pyinstrument — ещё и pyinstrument.
+# LAB5_PROFILE_DUMP=<папка> сохраняет профиль каждого терминала в файл.
+PROFILE_ENV = 'LAB5_PROFILE'
+PROFILE_DUMP_ENV = 'LAB5_PROFILE_DUMP'
+
+
+class StageProfiler:
+    """Замеряет время, число строк и память по этапам обработки одного терминала.
+
+    В выключенном состоянии все методы ничего не замеряют, поэтому профайлер
+    можно передавать в solve_task всегда.
+
+    Attributes:
+        terminal_id (str): ID терминала, для которого собирается отчёт.
+        enabled (bool): Включены ли замеры.
+        dump_dir (str): Папка для профилей cProfile/pyinstrument или None.
+        use_pyinstrument (bool): Профилировать ли через pyinstrument вместо cProfile.
+        stages (list[dict]): Замеры этапов в порядке выполнения.
+    """
+
+    def __init__(self, terminal_id, enabled=False, dump_dir=None, use_pyinstrument=False):
+        """Инициализирует профайлер.
+
+        Args:
+            terminal_id (str): ID терминала.
+            enabled (bool, optional): Включить замеры. По умолчанию False.
+            dump_dir (str, optional): Папка для файлов профиля. По умолчанию None.
+            use_pyinstrument (bool, optional): Использовать pyinstrument. По умолчанию False.
+        """
+        self.terminal_id = terminal_id
+        self.enabled = enabled
+        self.dump_dir = dump_dir
+        self.use_pyinstrument = use_pyinstrument
+        self.stages = []
+
+    @classmethod
+    def from_env(cls, terminal_id):
+        """Создаёт профайлер по переменным окружения LAB5_PROFILE и LAB5_PROFILE_DUMP."""
+        mode = os.environ.get(PROFILE_ENV, '').strip().lower()
+        return cls(
+            terminal_id,
+            enabled=mode not in ('', '0', 'false', 'no'),
+            dump_dir=os.environ.get(PROFILE_DUMP_ENV) or None,
+            use_pyinstrument=mode == 'pyinstrument',
+        )
+
+    @contextlib.contextmanager
+    def profile(self):
+        """Оборачивает всю обработку терминала: включает tracemalloc и профилировщик."""
+        if not self.enabled:
+            yield
+            return
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+
+        profiler = None
+        if self.dump_dir:
+            profiler = self._start_profiler()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                self._dump_profiler(profiler)
+            if started_tracing:
+                tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        """Замеряет один этап обработки.
+
+        Args:
+            name (str): Название этапа.
+            rows (int, optional): Количество строк на входе этапа.
+        Return:
+            Словарь замера; в него можно записать 'rows_out' — число строк на выходе.
+        """
+        record = {'stage': name, 'rows': rows}
+        if not self.enabled:
+            yield record
+            return
+
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                record['memory_delta_kb'] = (current - memory_before) / 1024
+                record['memory_peak_kb'] = (peak - memory_before) / 1024
+            self.stages.append(record)
+
+    def report(self):
+        """Возвращает отчёт по терминалу.
+
+        Return:
+            Словарь с ключами 'terminal_id', 'total_seconds' и 'stages'.
+        """
+        return {
+            'terminal_id': self.terminal_id,
+            'total_seconds': sum(s['seconds'] for s in self.stages),
+            'stages': list(self.stages),
+        }
+
+    def _start_profiler(self):
+        if self.use_pyinstrument:
+            try:
+                import pyinstrument
+            except ImportError:
+                print("pyinstrument не установлен, используется cProfile.")
+            else:
+                profiler = pyinstrument.Profiler()
+                profiler.start()
+                return profiler
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _dump_profiler(self, profiler):
+        os.makedirs(self.dump_dir, exist_ok=True)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            profiler.dump_stats(os.path.join(
+                self.dump_dir, f'{self.terminal_id}.prof'))
+        else:
+            profiler.stop()
+            with open(os.path.join(self.dump_dir, f'{self.terminal_id}.html'), 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+
+
+def print_reports(reports):
+    """Выводит отчёты по терминалам и суммарное время этапов по всему парку.
+
+    Args:
+        reports (list[dict]): Отчёты StageProfiler.report().
+    """
+    totals = {}
+
+    for report in reports:
+        print(f"\nПрофиль terminal_id {report['terminal_id']}: "
+              f"{report['total_seconds']:.3f} с")
+        for s in report['stages']:
+            totals[s['stage']] = totals.get(s['stage'], 0) + s['seconds']
+            rows = f"{s['rows']} -> {s.get('rows_out', s['rows'])}" if s['rows'] is not None else ''
+            memory = f"{s['memory_delta_kb']:+.0f} КБ (пик {s['memory_peak_kb']:.0f} КБ)" \
+                if 'memory_delta_kb' in s else ''
+            print(f"  {s['stage']:<16} {s['seconds']:>8.3f} с  {rows:<16} {memory}")
+
+    if len(reports) > 1:
+        total = sum(totals.values()) or 1
+        print("\nСуммарно по всем терминалам:")
+        for name, seconds in sorted(totals.items(), key=lambda x: -x[1]):
+            print(f"  {name:<16} {seconds:>8.3f} с  {seconds / total:>6.1%}")
@@ -0,0 +1,79 @@
+import pandas as pd
+
+
+# Агрегации, допустимые для значений внутри ячейки сетки
+AGGREGATIONS = ('min', 'max', 'mean', 'last')
+
+
+def resample_terminal(data, rule='30s', agg='mean', columns=('LLS_0_liters', 'speed')):
+    """Переносит ряд одного терминала на равномерную временную сетку.
+
+    Точные дубликаты временных меток отбрасываются (остаётся последняя запись).
+    Пустые ячейки сетки сохраняются со значениями NaN и отмечаются в столбце gap,
+    поэтому детектирование не склеивает окна через разрывы связи.
+
+    Args:
+        data (pd.DataFrame): Данные одного терминала со столбцом timestamp.
+        rule (str): Шаг сетки в формате pandas, например '30s' или '1min'.
+        agg (str | dict): Агрегация из AGGREGATIONS или словарь {столбец: агрегация}.
+        columns (tuple[str]): Столбцы, которые переносятся на сетку (отсутствующие пропускаются).
+    Return:
+        DataFrame со столбцами datetime, timestamp, samples, gap и выбранными столбцами.
+    """
+    aggs = agg if isinstance(agg, dict) else dict.fromkeys(columns, agg)
+    aggs = {column: how for column, how in aggs.items() if column in data}
+    for how in aggs.values():
+        if how not in AGGREGATIONS:
+            raise ValueError(
+                f"Неизвестная агрегация: {how}. Доступны: {', '.join(AGGREGATIONS)}")
+
+    frame = data.drop_duplicates(subset='timestamp', keep='last')
+    frame = frame[list(aggs)].set_index(
+        pd.DatetimeIndex(pd.to_datetime(frame['timestamp'], unit='s'), name='datetime'))
+
+    grouped = frame.sort_index().resample(rule)
+    result = grouped.agg(aggs)
+    result['samples'] = grouped.size()
+    result['gap'] = result['samples'] == 0
+
+    result = result.reset_index()
+    result['timestamp'] = result['datetime'].astype('int64') // 10 ** 9
+    return result
+
+
+class ResampleCache:
+    """Кэш рядов одного терминала на нескольких разрешениях.
+
+    Исходные данные хранятся для детализации, а ряды на сетке строятся
+    при первом запросе и переиспользуются.
+
+    Attributes:
+        raw (pd.DataFrame): Исходные данные терминала.
+        columns (tuple[str]): Столбцы, которые переносятся на сетку.
+    """
+
+    def __init__(self, raw, columns=('LLS_0_liters', 'speed')):
+        """Инициализирует кэш.
+
+        Args:
+            raw (pd.DataFrame): Исходные данные терминала.
+            columns (tuple[str], optional): Столбцы, которые переносятся на сетку.
+        """
+        self.raw = raw
+        self.columns = columns
+        self._cache = {}
+
+    def get(self, rule=None, agg='mean'):
+        """Возвращает ряд на сетке с шагом rule (или исходные данные, если rule=None)."""
+        if rule is None:
+            return self.raw
+
+        key = (rule, agg if isinstance(agg, str) else tuple(sorted(agg.items())))
+        if key not in self._cache:
+            self._cache[key] = resample_terminal(
+                self.raw, rule, agg, self.columns)
+        return self._cache[key]
+
+    def pyramid(self, rules=('30s', '1min', '5min', '15min'), agg='mean'):
+        """Строит ряды на нескольких разрешениях и возвращает словарь {шаг: DataFrame}."""
+        return {rule: self.get(rule, agg) for rule in rules}
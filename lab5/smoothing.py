@@ -0,0 +1,87 @@
+import pandas as pd
+
+
+def rolling_median(values, window=5):
+    """Скользящая медиана с центрированным окном.
+
+    Args:
+        values (pd.Series): Исходный ряд.
+        window (int): Размер окна (в точках).
+    Return:
+        Сглаженный pd.Series.
+    """
+    return values.rolling(window, center=True, min_periods=1).median()
+
+
+def savgol(values, window=7, polyorder=2):
+    """Фильтр Савицкого–Голея (требуется scipy).
+
+    Пропуски на время фильтрации заполняются ближайшими значениями и
+    восстанавливаются в результате.
+
+    Args:
+        values (pd.Series): Исходный ряд.
+        window (int): Размер окна (в точках, нечётный).
+        polyorder (int): Степень аппроксимирующего полинома.
+    Return:
+        Сглаженный pd.Series.
+    """
+    from scipy.signal import savgol_filter
+
+    missing = values.isna()
+    filled = values.ffill().bfill()
+    if filled.isna().all() or len(filled) < window:
+        return values
+
+    smoothed = pd.Series(savgol_filter(filled.to_numpy(dtype=float), window, polyorder),
+                         index=values.index)
+    return smoothed.mask(missing)
+
+
+def hampel(values, window=7, n_sigmas=3):
+    """Фильтр Хампеля: заменяет выбросы на скользящую медиану.
+
+    Точка считается выбросом, если отклоняется от медианы окна больше чем на
+    n_sigmas оценок стандартного отклонения по MAD.
+
+    Args:
+        values (pd.Series): Исходный ряд.
+        window (int): Размер окна (в точках).
+        n_sigmas (float): Порог в оценках стандартного отклонения.
+    Return:
+        pd.Series с заменёнными выбросами.
+    """
+    median = rolling_median(values, window)
+    deviation = (values - median).abs()
+    # 1.4826 — коэффициент перехода от MAD к стандартному отклонению для нормального распределения
+    mad = 1.4826 * rolling_median(deviation, window)
+    outliers = deviation > n_sigmas * mad
+    return values.mask(outliers, median)
+
+
+FILTERS = {
+    'median': rolling_median,
+    'savgol': savgol,
+    'hampel': hampel,
+}
+
+
+def smooth(values, method=None):
+    """Сглаживает ряд выбранным фильтром.
+
+    Args:
+        values (pd.Series): Исходный ряд.
+        method (str | tuple): Название фильтра из FILTERS или кортеж (название, параметры).
+                              Если None, ряд возвращается без изменений.
+    Return:
+        Сглаженный pd.Series.
+    """
+    if method is None:
+        return values
+
+    name, params = (method, {}) if isinstance(method, str) else method
+    if name not in FILTERS:
+        raise ValueError(
+            f"Неизвестный метод сглаживания: {name}. Доступны: {', '.join(FILTERS)}")
+
+    return FILTERS[name](values.astype(float), **params)
@@ -0,0 +1,258 @@
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from lab5 import load_data, solve_fleet, split_by_terminal
+
+
+# Файл хранилища результатов по умолчанию
+STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.sqlite')
+# Параметры детектирования для ночного запуска
+DEFAULT_PARAMS = {'smoothing': ['hampel', {'window': 7}]}
+
+
+def file_hash(filepath, chunk_size=1 << 20):
+    """Считает SHA-256 содержимого файла, читая его блоками."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def params_hash(params):
+    """Считает хеш параметров детектирования (не зависит от порядка ключей)."""
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+class ResultStore:
+    """Хранилище результатов детектирования в SQLite.
+
+    Результаты ключуются по (хеш файла, terminal_id, хеш параметров), поэтому
+    повторный запуск на тех же данных с теми же параметрами ничего не пересчитывает.
+
+    Attributes:
+        conn (sqlite3.Connection): Соединение с базой данных.
+        cur (sqlite3.Cursor): Курсор для выполнения SQL-запросов.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        """Открывает (и при необходимости создаёт) хранилище.
+
+        Args:
+            path (str, optional): Путь к файлу базы данных.
+        """
+        self.conn = sqlite3.connect(path)
+        self.cur = self.conn.cursor()
+        self.cur.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                file_hash TEXT,
+                params_hash TEXT,
+                path TEXT,
+                params TEXT,
+                processed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (file_hash, params_hash)
+            );
+            CREATE TABLE IF NOT EXISTS events (
+                file_hash TEXT,
+                params_hash TEXT,
+                terminal_id TEXT,
+                event TEXT,
+                start TEXT,
+                "end" TEXT,
+                value REAL,
+                lat REAL,
+                lon REAL
+            );
+            CREATE TABLE IF NOT EXISTS terminal_stats (
+                file_hash TEXT,
+                params_hash TEXT,
+                terminal_id TEXT,
+                rows INTEGER,
+                first_timestamp INTEGER,
+                last_timestamp INTEGER,
+                max_speed REAL,
+                overspeeds INTEGER,
+                refills INTEGER,
+                drains INTEGER,
+                PRIMARY KEY (file_hash, params_hash, terminal_id)
+            );
+            CREATE INDEX IF NOT EXISTS events_terminal ON events (terminal_id, start);
+        """)
+        self.conn.commit()
+
+    def has_run(self, file_hash, params_hash):
+        """Проверяет, обработан ли файл с данными параметрами."""
+        self.cur.execute("SELECT 1 FROM runs WHERE file_hash = ? AND params_hash = ?",
+                         (file_hash, params_hash))
+        return self.cur.fetchone() is not None
+
+    def save(self, file_hash, params, path, events, stats):
+        """Сохраняет результаты обработки файла одной транзакцией.
+
+        Args:
+            file_hash (str): Хеш содержимого файла.
+            params (dict): Параметры детектирования.
+            path (str): Путь к файлу (для справки).
+            events (pd.DataFrame): Таблица событий (см. lab5.solve_fleet).
+            stats (pd.DataFrame): Статистика по терминалам (см. terminal_stats).
+        """
+        key = params_hash(params)
+        with self.conn:
+            self.cur.executemany(
+                'INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(file_hash, key, str(e.terminal_id), e.event, str(e.start), str(e.end),
+                  float(e.value), float(e.lat), float(e.lon))
+                 for e in events.itertuples(index=False)])
+            self.cur.executemany(
+                'INSERT OR REPLACE INTO terminal_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(file_hash, key, str(s.terminal_id), int(s.rows), int(s.first_timestamp),
+                  int(s.last_timestamp), float(s.max_speed), int(s.overspeeds),
+                  int(s.refills), int(s.drains))
+                 for s in stats.itertuples(index=False)])
+            self.cur.execute(
+                'INSERT OR REPLACE INTO runs (file_hash, params_hash, path, params) VALUES (?, ?, ?, ?)',
+                (file_hash, key, path, json.dumps(params, sort_keys=True)))
+
+    def events(self, terminal_id=None, event=None, start=None, end=None, params=None):
+        """Возвращает сохранённые события с фильтрами по терминалу, типу и времени.
+
+        Args:
+            terminal_id (str, optional): ID терминала.
+            event (str, optional): Тип события: 'overspeed', 'refill' или 'drain'.
+            start (str, optional): Нижняя граница начала события ('YYYY-MM-DD HH:MM:SS').
+            end (str, optional): Верхняя граница начала события.
+            params (dict, optional): Параметры детектирования. По умолчанию — любые.
+        Return:
+            DataFrame с событиями, отсортированными по терминалу и времени.
+        """
+        conditions, values = [], []
+        for condition, value in (('terminal_id = ?', terminal_id), ('event = ?', event),
+                                 ('start >= ?', start), ('start <= ?', end),
+                                 ('params_hash = ?', params_hash(params) if params is not None else None)):
+            if value is not None:
+                conditions.append(condition)
+                values.append(str(value))
+
+        query = 'SELECT * FROM events'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY terminal_id, start'
+        return pd.read_sql_query(query, self.conn, params=values)
+
+    def stats(self, terminal_id=None):
+        """Возвращает сохранённую статистику по терминалам."""
+        if terminal_id is None:
+            return pd.read_sql_query('SELECT * FROM terminal_stats', self.conn)
+        return pd.read_sql_query('SELECT * FROM terminal_stats WHERE terminal_id = ?',
+                                 self.conn, params=[str(terminal_id)])
+
+    def close(self):
+        """Закрывает соединение с базой данных."""
+        self.cur.close()
+        self.conn.close()
+
+
+def terminal_stats(data, events):
+    """Считает статистику по каждому терминалу файла.
+
+    Args:
+        data (pd.DataFrame): Исходные данные.
+        events (pd.DataFrame): Таблица событий (см. lab5.solve_fleet).
+    Return:
+        DataFrame со столбцами terminal_id, rows, first_timestamp, last_timestamp,
+        max_speed, overspeeds, refills, drains.
+    """
+    stats = pd.DataFrame([
+        (terminal_id, len(terminal_data), terminal_data['timestamp'].min(),
+         terminal_data['timestamp'].max(), terminal_data['speed'].max())
+        for terminal_id, terminal_data in split_by_terminal(data).items()
+    ], columns=['terminal_id', 'rows', 'first_timestamp', 'last_timestamp', 'max_speed'])
+
+    if events.empty:
+        counts = pd.DataFrame(columns=['overspeed', 'refill', 'drain'])
+    else:
+        counts = events.groupby(['terminal_id', 'event']).size().unstack(fill_value=0)
+        counts = counts.reindex(columns=['overspeed', 'refill', 'drain'], fill_value=0)
+    counts.columns = ['overspeeds', 'refills', 'drains']
+
+    stats = stats.merge(counts, left_on='terminal_id', right_index=True, how='left')
+    stats[['overspeeds', 'refills', 'drains']] = stats[['overspeeds', 'refills', 'drains']] \
+        .fillna(0).astype(int)
+    return stats
+
+
+def analyze_file(filepath, params):
+    """Обрабатывает один файл (выполняется в дочернем процессе).
+
+    Return:
+        Кортеж (события, статистика по терминалам).
+    """
+    data = load_data(filepath)
+    events = solve_fleet(data, **params)
+    return events, terminal_stats(data, events)
+
+
+def run_pending(filepaths, params=DEFAULT_PARAMS, store_path=STORE_PATH, workers=None):
+    """Обрабатывает параллельно только новые или изменившиеся файлы и сохраняет результаты.
+
+    Хеши файлов и запись в хранилище выполняются в основном процессе,
+    детектирование — в пуле процессов.
+
+    Args:
+        filepaths (list[str]): Пути к CSV файлам.
+        params (dict): Параметры для lab5.solve_fleet.
+        store_path (str): Путь к файлу хранилища.
+        workers (int, optional): Количество процессов. По умолчанию — число ядер.
+    Return:
+        Список обработанных файлов.
+    """
+    store = ResultStore(store_path)
+    key = params_hash(params)
+    try:
+        pending = {}
+        for filepath in filepaths:
+            digest = file_hash(filepath)
+            if store.has_run(digest, key) or digest in pending.values():
+                print(f"{filepath}: результаты уже в хранилище")
+                continue
+            pending[filepath] = digest
+
+        processed = []
+        if not pending:
+            return processed
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(analyze_file, filepath, params): filepath
+                       for filepath in pending}
+            for future in as_completed(futures):
+                filepath = futures[future]
+                try:
+                    events, stats = future.result()
+                except Exception as e:
+                    print(f"{filepath}: ошибка обработки: {e}")
+                    continue
+                store.save(pending[filepath], params, filepath, events, stats)
+                processed.append(filepath)
+                print(f"{filepath}: сохранено событий: {len(events)}")
+
+        return processed
+    finally:
+        store.close()
+
+
+def main():
+    """Ночной запуск: обрабатывает новые файлы из аргументов или все CSV из папки lab5."""
+    filepaths = sys.argv[1:] or sorted(glob.glob(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.csv')))
+    run_pending(filepaths)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+
+# Средний радиус Земли (км)
+EARTH_RADIUS_KM = 6371.0088
+
+TRIP_COLUMNS = ['terminal_id', 'trip', 'start', 'end', 'duration_s', 'distance_km',
+                'max_speed', 'fuel_used', 'liters_per_100km']
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Расстояние по большому кругу между парами точек (км), векторно по массивам.
+
+    Args:
+        lat1, lon1 (array-like): Координаты первых точек в градусах.
+        lat2, lon2 (array-like): Координаты вторых точек в градусах.
+    Return:
+        np.ndarray с расстояниями в километрах.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=float))
+                              for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 \
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def segment_trips(data, gap_seconds=600):
+    """Размечает поездки в данных одного или нескольких терминалов.
+
+    Точка считается точкой движения, если включено зажигание, есть признак
+    motion или ненулевая скорость. Поездка — непрерывная последовательность
+    таких точек одного терминала без разрывов по времени больше gap_seconds.
+
+    Args:
+        data (pd.DataFrame): Данные со столбцами terminal_id, timestamp, lat, lon, speed
+                             и, если есть, ignition и motion.
+        gap_seconds (int): Разрыв по времени (в секундах), который завершает поездку.
+    Return:
+        Копия данных, отсортированная по (terminal_id, timestamp), со столбцами
+        trip (номер поездки, -1 вне поездок) и step_km (путь от предыдущей точки поездки).
+    """
+    frame = data.sort_values(by=['terminal_id', 'timestamp'],
+                             kind='mergesort').reset_index(drop=True)
+
+    moving = (frame['speed'] > 0).to_numpy()
+    for column in ('ignition', 'motion'):
+        if column in frame:
+            moving |= (frame[column] == 1).to_numpy()
+
+    ids = frame['terminal_id'].astype(str).to_numpy()
+    timestamps = frame['timestamp'].to_numpy()
+    boundary = np.r_[True, (ids[1:] != ids[:-1]) |
+                     (np.diff(timestamps) > gap_seconds)]
+    previous_moving = np.r_[False, moving[:-1]]
+
+    starts = moving & (boundary | ~previous_moving)
+    trip = np.where(moving, np.cumsum(starts) - 1, -1)
+
+    lat = frame['lat'].to_numpy(dtype=float)
+    lon = frame['lon'].to_numpy(dtype=float)
+    step = np.zeros(len(frame))
+    if len(frame) > 1:
+        step[1:] = haversine(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    # Путь считаем только между соседними точками одной поездки
+    same_trip = (trip >= 0) & ~starts
+    step = np.where(same_trip & ~np.isnan(step), step, 0.0)
+
+    frame['trip'] = trip
+    frame['step_km'] = step
+    return frame
+
+
+def summarize_trips(data, gap_seconds=600):
+    """Считает по каждой поездке путь, длительность, максимальную скорость и расход топлива.
+
+    Args:
+        data (pd.DataFrame): Данные одного или нескольких терминалов (см. segment_trips).
+                             Если есть столбец LLS_0_liters, считается расход топлива.
+        gap_seconds (int): Разрыв по времени (в секундах), который завершает поездку.
+    Return:
+        DataFrame со столбцами TRIP_COLUMNS.
+    """
+    frame = segment_trips(data, gap_seconds)
+    frame = frame[frame['trip'] >= 0]
+    if frame.empty:
+        return pd.DataFrame(columns=TRIP_COLUMNS)
+
+    if 'LLS_0_liters' not in frame:
+        frame = frame.assign(LLS_0_liters=np.nan)
+
+    trips = frame.groupby('trip').agg(
+        terminal_id=('terminal_id', 'first'),
+        start=('timestamp', 'min'),
+        end=('timestamp', 'max'),
+        distance_km=('step_km', 'sum'),
+        max_speed=('speed', 'max'),
+        fuel_start=('LLS_0_liters', 'first'),
+        fuel_end=('LLS_0_liters', 'last'),
+    ).reset_index()
+
+    trips['duration_s'] = trips['end'] - trips['start']
+    trips['start'] = pd.to_datetime(trips['start'], unit='s')
+    trips['end'] = pd.to_datetime(trips['end'], unit='s')
+    trips['fuel_used'] = trips['fuel_start'] - trips['fuel_end']
+    trips['liters_per_100km'] = (trips['fuel_used'] / trips['distance_km'] * 100) \
+        .where(trips['distance_km'] > 0)
+
+    return trips[TRIP_COLUMNS]